@@ -0,0 +1,166 @@
+import pytest
+
+from tuxeatpi_nlu_nuance.concepts import ConceptIndex
+
+
+TRSX = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<project xmlns:nuance="https://developer.nuance.com/mix/nlu/trsx" xml:lang="en-US" nuance:version="2.0">
+  <ontology base="http://developer.nuance.com/mix/nlu/trsx/ontology-1.0">
+    <intents>
+      <intent name="nlu__test"/>
+    </intents>
+    <concepts>
+      <concept name="COLOR"/>
+      <concept name="COUNT">
+        <relations>
+          <relation type="isA" conceptref="nuance_CARDINAL_NUMBER"/>
+        </relations>
+      </concept>
+      <concept name="WHEN">
+        <relations>
+          <relation type="isA" conceptref="nuance_CALENDARX"/>
+        </relations>
+      </concept>
+      <concept name="NAME"/>
+      <concept name="PRICE">
+        <relations>
+          <relation type="isA" conceptref="COUNT"/>
+        </relations>
+      </concept>
+      <concept name="LOOP">
+        <relations>
+          <relation type="isA" conceptref="LOOP2"/>
+        </relations>
+      </concept>
+      <concept name="LOOP2">
+        <relations>
+          <relation type="isA" conceptref="LOOP"/>
+        </relations>
+      </concept>
+    </concepts>
+  </ontology>
+  <dictionaries>
+    <dictionary conceptref="COLOR">
+      <entry literal="Red" value="RED"/>
+      <entry literal="crimson" value="RED"/>
+    </dictionary>
+  </dictionaries>
+  <samples>
+  </samples>
+</project>
+"""
+
+
+class TestConcepts(object):
+
+    @classmethod
+    def setup_class(self):
+        self.index = ConceptIndex()
+        self.index.load("general", "en_US", "nlu/nlu.trsx", TRSX)
+
+    @pytest.mark.order1
+    def test_types(self):
+        assert self.index.get_type("general", "en_US", "COLOR") == "enum"
+        assert self.index.get_type("general", "en_US", "COUNT") == "number"
+        assert self.index.get_type("general", "en_US", "WHEN") == "datetime"
+        assert self.index.get_type("general", "en_US", "NAME") == "string"
+        assert self.index.get_type("general", "fr_FR", "COLOR") == "string"
+
+    @pytest.mark.order1
+    def test_inherited_types(self):
+        self.index.load("general", "en_US", "nlu/shade.trsx", """<project>
+  <ontology>
+    <concepts>
+      <concept name="SHADE">
+        <relations>
+          <relation type="isA" conceptref="COLOR"/>
+        </relations>
+      </concept>
+      <concept name="DEADLINE">
+        <relations>
+          <relation type="isA" conceptref="WHEN"/>
+        </relations>
+      </concept>
+    </concepts>
+  </ontology>
+</project>""")
+        assert self.index.get_type("general", "en_US", "PRICE") == "number"
+        assert self.index.get_type("general", "en_US", "SHADE") == "enum"
+        assert self.index.get_type("general", "en_US", "DEADLINE") == "datetime"
+        assert self.index.get_type("general", "en_US", "LOOP") == "string"
+        values = self.index.normalize("general", "en_US", "PRICE",
+                                      [{"literal": "twelve", "value": "12"}])
+        assert values[0]["value"] == 12
+        values = self.index.normalize("general", "en_US", "SHADE",
+                                      [{"literal": "crimson", "value": "crimson"}])
+        assert values[0]["value"] == "RED"
+
+    @pytest.mark.order1
+    def test_normalize(self):
+        values = self.index.normalize("general", "en_US", "COUNT",
+                                      [{"literal": "twelve", "value": "12"},
+                                       {"literal": "twelve", "value": "1.2"}])
+        assert [v["value"] for v in values] == [12, 1.2]
+        values = self.index.normalize("general", "en_US", "COLOR",
+                                      [{"literal": "crimson", "value": "crimson"}])
+        assert values[0]["value"] == "RED"
+        assert values[0]["type"] == "enum"
+        when = {"nuance_DATE": {"nuance_DATE_ABS": {"nuance_YEAR": 2017,
+                                                    "nuance_MONTH": 9,
+                                                    "nuance_DAY": 14}},
+                "nuance_TIME": {"nuance_TIME_ABS": {"nuance_HOUR": 3,
+                                                    "nuance_MINUTE": 19}}}
+        values = self.index.normalize("general", "en_US", "WHEN",
+                                      [{"literal": "tomorrow", "value": when}])
+        assert values[0]["value"] == "2017-09-14T03:19:00"
+        values = self.index.normalize("general", "en_US", "NAME",
+                                      [{"literal": "Tux", "value": "Tux"}])
+        assert values[0]["value"] == "Tux"
+
+    @pytest.mark.order1
+    def test_normalize_bad_values(self):
+        # Unexpected shapes are shipped raw
+        for raw in ({"nuance_DATE": "2020"},
+                    {"nuance_TIME": ["3", "19"]},
+                    {"nuance_DATE": {"nuance_DATE_ABS": "2020"}},
+                    "tomorrow"):
+            values = self.index.normalize("general", "en_US", "WHEN",
+                                          [{"literal": "tomorrow", "value": raw}])
+            assert values[0]["value"] == raw
+
+    @pytest.mark.order1
+    def test_normalize_partial_datetime(self):
+        date = {"nuance_DATE_ABS": {"nuance_YEAR": 2017, "nuance_MONTH": 9, "nuance_DAY": 14}}
+        values = self.index.normalize("general", "en_US", "WHEN",
+                                      [{"literal": "september 14th",
+                                        "value": {"nuance_DATE": date}}])
+        assert values[0]["value"] == "2017-09-14"
+        values = self.index.normalize("general", "en_US", "WHEN",
+                                      [{"literal": "3:19", "value": {"nuance_TIME": {
+                                          "nuance_TIME_ABS": {"nuance_HOUR": 3,
+                                                              "nuance_MINUTE": 19}}}}])
+        assert values[0]["value"] == "03:19:00"
+        # Information which can not be converted is kept raw
+        for raw in ({"nuance_DATE": date,
+                     "nuance_TIME": {"nuance_TIME_REL": {"nuance_HOURS": 2}}},
+                    {"nuance_TIME": {"nuance_TIME_ABS": {"nuance_HOUR": 3,
+                                                         "nuance_AMPM": "pm"}}},
+                    {"nuance_DATE": {"nuance_DATE_ABS": {"nuance_MONTH": 9,
+                                                         "nuance_DAY": 14}}},
+                    {}):
+            values = self.index.normalize("general", "en_US", "WHEN",
+                                          [{"literal": "3 pm", "value": raw}])
+            assert values[0]["value"] == raw
+
+    @pytest.mark.order1
+    def test_normalize_duration(self):
+        assert self.index.get_type("general", "en_US", "nuance_DURATION") == "duration"
+        values = self.index.normalize("general", "en_US", "nuance_DURATION",
+                                      [{"literal": "one hour and a half",
+                                        "value": {"nuance_DURATION": {"nuance_HOURS": 1,
+                                                                      "nuance_MINUTES": "30"}}}])
+        assert values[0]["value"] == 5400
+        raw = {"nuance_DURATION": {"nuance_HOURS": "one"}}
+        values = self.index.normalize("general", "en_US", "nuance_DURATION",
+                                      [{"literal": "one hour", "value": raw}])
+        assert values[0]["value"] == raw
@@ -135,6 +135,119 @@ class TestDaemon(object):
 
         return
 
+    @pytest.mark.order2
+    def test_nlu_concepts(self, capsys):
+        trsx = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<project xmlns:nuance="https://developer.nuance.com/mix/nlu/trsx" xml:lang="en-US" nuance:version="2.0">
+  <ontology base="http://developer.nuance.com/mix/nlu/trsx/ontology-1.0">
+    <concepts>
+      <concept name="COUNT">
+        <relations>
+          <relation type="isA" conceptref="nuance_CARDINAL_NUMBER"/>
+        </relations>
+      </concept>
+    </concepts>
+  </ontology>
+  <dictionaries>
+    <dictionary conceptref="COLOR">
+      <entry literal="crimson" value="RED"/>
+    </dictionary>
+  </dictionaries>
+</project>
+"""
+        self.nlu_daemon._concepts.load("general", "en_US", "nlu_test/concepts.trsx", trsx)
+        concepts = {"COUNT": [{"literal": "twelve", "value": "12"},
+                              {"literal": "twelve", "value": "1.2"}],
+                    "COLOR": [{"literal": "crimson", "value": "crimson"}],
+                    "WHEN": [{"literal": "now", "value": {"nuance_DATE": "now"}}],
+                    }
+        raw_result = _fake_nlu_result(concepts=concepts)
+        result = self.nlu_daemon._handle_nlu_return(raw_result, "general")
+        assert result["error"] is None
+        assert result["arguments"] == {"COUNT": 12, "COLOR": "RED", "WHEN": {"nuance_DATE": "now"}}
+        assert [c["value"] for c in result["concepts"]["COUNT"]] == [12, 1.2]
+        assert result["concepts"]["COLOR"][0]["type"] == "enum"
+        assert result["concepts"]["WHEN"][0]["type"] == "string"
+        # Typed arguments are published
+        from pynuance import nlu
+        nlu.understand_audio = lambda *args, **kargs: _fake_nlu_result(concepts=concepts)
+        # Callbacks write the class attribute
+        TestDaemon.message = None
+        self.nlu_daemon.audio()
+        time.sleep(1)
+        assert self.message == {"COUNT": 12, "COLOR": "RED", "WHEN": {"nuance_DATE": "now"}}
+
+
+    @pytest.mark.order3
+    def test_nlu_thresholds(self, capsys):
+        thresholds = self.nlu_daemon._thresholds
+        self.nlu_daemon._last_accepted = None
+        # Per intent threshold
+        thresholds.record("general", "en_US", "nlu_test__risky", 0.8, False)
+        result = self.nlu_daemon._handle_nlu_return(
+            _fake_nlu_result("nlu_test__risky", 0.8), "general")
+        assert result["error"] == "NEED_CONFIRMATION"
+        assert result["intent"] == "nlu_test__risky"
+        result = self.nlu_daemon._handle_nlu_return(
+            _fake_nlu_result("nlu_test__test", 0.8), "general")
+        assert result["error"] is None
+        # Re-prompt confirmed by the same intent
+        from pynuance import nlu
+        answers = [_fake_nlu_result("nlu_test__other", 0.5),
+                   _fake_nlu_result("nlu_test__other", 0.9)]
+        nlu.understand_audio = lambda *args, **kargs: answers.pop(0)
+        self.nlu_daemon.audio()
+        assert answers == []
+        assert thresholds.get("general", "en_US", "nlu_test__other") < 0.7
+        assert thresholds._table["en_US"]["general"]["nlu_test__other"]["confirmed"] == 1
+        # Re-prompt not understood
+        answers = [_fake_nlu_result("nlu_test__lost", 0.5),
+                   _fake_nlu_result("NO_MATCH", 0.9)]
+        self.nlu_daemon.audio()
+        assert answers == []
+        assert thresholds._table["en_US"]["general"]["nlu_test__lost"]["rejected"] == 1
+        assert thresholds.get("general", "en_US", "nlu_test__lost") == 0.7
+
+    @pytest.mark.order4
+    def test_nlu_corrections(self, capsys):
+        thresholds = self.nlu_daemon._thresholds
+        from pynuance import nlu
+        # Accepted intent quickly corrected by another one
+        answers = [_fake_nlu_result("nlu_test__quick", 0.8),
+                   _fake_nlu_result("nlu_test__fixed", 0.9)]
+        nlu.understand_audio = lambda *args, **kargs: answers.pop(0)
+        self.nlu_daemon.audio()
+        assert thresholds.get("general", "en_US", "nlu_test__quick") == 0.7
+        self.nlu_daemon.audio()
+        assert answers == []
+        assert thresholds.get("general", "en_US", "nlu_test__quick") == pytest.approx(0.85)
+        assert thresholds._table["en_US"]["general"]["nlu_test__quick"]["rejected"] == 1
+        result = self.nlu_daemon._handle_nlu_return(
+            _fake_nlu_result("nlu_test__quick", 0.8), "general")
+        assert result["error"] == "NEED_CONFIRMATION"
+        # Not understood and late answers are not corrections
+        answers = [_fake_nlu_result("nlu_test__slow", 0.8),
+                   _fake_nlu_result("NO_MATCH", 0.9),
+                   _fake_nlu_result("nlu_test__slow", 0.8),
+                   _fake_nlu_result("nlu_test__fixed", 0.9)]
+        self.nlu_daemon.audio()
+        self.nlu_daemon.audio()
+        self.nlu_daemon.audio()
+        self.nlu_daemon._last_accepted["time"] -= self.nlu_daemon._correction_delay + 1
+        self.nlu_daemon.audio()
+        assert answers == []
+        assert thresholds.get("general", "en_US", "nlu_test__slow") == 0.7
+
+
+def _fake_nlu_result(intent="nlu_test__test", confidence=1.0, concepts=None):
+    """Return a fake Nuance NLU result"""
+    result = _fake_nlu_text2()
+    interpretation = result['nlu_interpretation_results']['payload']['interpretations'][0]
+    interpretation['action']['intent'] = {'confidence': confidence, 'value': intent}
+    if concepts is not None:
+        interpretation['concepts'] = concepts
+    return result
+
 
 def _fake_nlu_text2(*args, **kargs):
     return {'NMAS_PRFX_SESSION_ID': 'FAKE',
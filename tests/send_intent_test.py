@@ -65,9 +65,66 @@ class TestIntent(object):
         mix.model_build_attach = MagicMock()
         self.nlu_daemon.send_intent("fake_intent", "en_US", "nlu_test", "fakefile", "fake_intent_data")
 
+    @pytest.mark.order2
+    def test_build_model(self, capsys):
+        from pynuance import mix, nlu
+        from unittest.mock import MagicMock
+        with open("intents/nuance/en_US/general/nlu.trsx") as tfh:
+            trsx = tfh.read()
+        assert self.nlu_daemon.send_intent("general", "en_US", "nlu", "nlu.trsx", trsx)
+        assert self.nlu_daemon.model_state("general", "en_US") == {"state": "UNKNOWN"}
+        # Build and warm up
+        texts = []
+
+        def understand_text(app_id, app_key, context_tag, text, language):
+            texts.append(text)
+            return fake_nlu_result("nlu__test")
+        nlu.understand_text = understand_text
+        self.nlu_daemon.build_model("general", "en_US")
+        state = self.nlu_daemon.model_state("general", "en_US")
+        assert state["state"] == "READY"
+        assert len(state["latencies"]) == 2
+        assert state["latency"] is not None
+        assert texts == ["Understanting test", "NLU test"]
+        # Attach failure does not hide a working model
+        mix.model_build_attach = MagicMock(side_effect=Exception("Already attached"))
+        self.nlu_daemon.build_model("general", "en_US")
+        assert self.nlu_daemon.model_state("general", "en_US")["state"] == "READY"
+        # Wrong intent
+        nlu.understand_text = lambda *args, **kargs: fake_nlu_result("NO_MATCH")
+        assert not self.nlu_daemon.warm_up_model("general", "en_US")
+        state = self.nlu_daemon.model_state("general", "en_US")
+        assert state["state"] == "FAILED"
+        assert state["errors"][0]["intent"] == "NO_MATCH"
+        # Bad result
+        nlu.understand_text = lambda *args, **kargs: "Bad result"
+        assert not self.nlu_daemon.warm_up_model("general", "en_US")
+        state = self.nlu_daemon.model_state("general", "en_US")
+        assert state["state"] == "FAILED"
+        assert len(state["errors"]) == 2
+        assert state["latencies"] == []
+        # Nothing to check
+        self.nlu_daemon._warmup_samples = 0
+        assert not self.nlu_daemon.warm_up_model("general", "en_US")
+        assert self.nlu_daemon.model_state("general", "en_US")["state"] == "UNVERIFIED"
+        self.nlu_daemon._warmup_samples = 3
+        # Failed build
+        mix.model_build_list = lambda *args, **kargs: [{'created_at': time.time(),
+                                                         'build_status': 'FAILED'}]
+        self.nlu_daemon.build_model("general", "en_US")
+        assert self.nlu_daemon.model_state("general", "en_US") == {"state": "FAILED"}
+        mix.model_build_list = model_build_list
+        # Unchanged model
+        assert not self.nlu_daemon.send_intent("general", "en_US", "nlu", "nlu.trsx", trsx)
+
 
 def list_models(username, password, cookies_file):
     return [{"name": "model1"}]
 
 def model_build_list(model, cookies_file):
     return [{'created_at': time.time(), 'build_status': 'COMPLETED'}]
+
+def fake_nlu_result(intent):
+    return {'nlu_interpretation_results': {'payload': {'interpretations': [
+        {'action': {'intent': {'confidence': 1.0, 'value': intent}},
+         'literal': 'NLU test'}]}}}
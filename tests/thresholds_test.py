@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import pytest
+
+from tuxeatpi_nlu_nuance.thresholds import IntentThresholds
+
+
+class TestThresholds(object):
+
+    @classmethod
+    def setup_class(self):
+        self.filepath = "tests/workdir_thresholds/models/thresholds.json"
+
+    @classmethod
+    def teardown_class(self):
+        shutil.rmtree("tests/workdir_thresholds")
+
+    @pytest.mark.order1
+    def test_thresholds(self):
+        thresholds = IntentThresholds(self.filepath, 0.7)
+        assert thresholds.get("general", "en_US", "nlu__test") == 0.7
+        # Confirmed at low confidence
+        new_threshold = thresholds.record("general", "en_US", "nlu__test", 0.5, True)
+        assert new_threshold < 0.7
+        assert new_threshold > 0.5
+        assert thresholds.get("general", "en_US", "nlu__test") == new_threshold
+        assert thresholds.get("general", "fr_FR", "nlu__test") == 0.7
+        # Rejected below the threshold: nothing to raise
+        assert thresholds.record("general", "en_US", "time__get", 0.2, False) == 0.7
+        assert thresholds.record("general", "en_US", "time__get", 0.6, False) == 0.7
+        # Confirmations can not lower it to an already rejected confidence
+        for _ in range(20):
+            thresholds.record("general", "en_US", "time__get", 0.4, True)
+        assert thresholds.get("general", "en_US", "time__get") == pytest.approx(0.65)
+        # Rejected at or above the threshold
+        assert thresholds.record("general", "en_US", "time__get", 0.8, False) == \
+            pytest.approx(0.85)
+        assert os.path.isfile(self.filepath)
+        # Reload from file
+        thresholds = IntentThresholds(self.filepath, 0.7)
+        assert thresholds.get("general", "en_US", "nlu__test") == new_threshold
+        # Bounds
+        for _ in range(50):
+            thresholds.record("general", "en_US", "nlu__test", 0.0, True)
+            thresholds.record("general", "en_US", "time__get", 0.0, False)
+        for _ in range(50):
+            thresholds.record("general", "en_US", "time__get", 1.0, False)
+        assert thresholds.get("general", "en_US", "nlu__test") == thresholds.min_threshold
+        assert thresholds.get("general", "en_US", "time__get") == thresholds.max_threshold
+
+    @pytest.mark.order1
+    def test_bad_file(self):
+        for data in ("", "{\"en_US\": {", "[]"):
+            with open(self.filepath, "w") as tfh:
+                tfh.write(data)
+            thresholds = IntentThresholds(self.filepath, 0.7)
+            assert thresholds.get("general", "en_US", "nlu__test") == 0.7
+            thresholds.record("general", "en_US", "nlu__test", 0.5, True)
+            assert IntentThresholds(self.filepath, 0.7).get("general", "en_US",
+                                                            "nlu__test") < 0.7
+        assert not os.path.exists(self.filepath + ".tmp")
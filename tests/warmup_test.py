@@ -0,0 +1,39 @@
+import os
+import shutil
+
+import pytest
+
+from tuxeatpi_nlu_nuance.warmup import read_model_samples, read_samples, select_samples
+
+
+class TestWarmup(object):
+
+    @classmethod
+    def teardown_class(self):
+        shutil.rmtree("tests/workdir_warmup")
+
+    @pytest.mark.order1
+    def test_read_samples(self):
+        with open("intents/nuance/en_US/general/nlu.trsx") as tfh:
+            samples = read_samples(tfh.read())
+        assert samples == [("Understanting test", "nlu__test"), ("NLU test", "nlu__test")]
+
+    @pytest.mark.order1
+    def test_read_model_samples(self):
+        comp_folder = "tests/workdir_warmup/models/fr_FR/general/nlu"
+        os.makedirs(comp_folder)
+        shutil.copy("intents/nuance/fr_FR/general/nlu.trsx", comp_folder)
+        with open(os.path.join(comp_folder, "bad.trsx"), "w") as tfh:
+            tfh.write("fake_intent_data")
+        with open(os.path.join(comp_folder, "binary.trsx"), "wb") as tfh:
+            tfh.write(b"\xff\xfe\x00<project>")
+        samples = read_model_samples("tests/workdir_warmup/models/fr_FR/general")
+        assert len(samples) == 3
+        assert read_model_samples("tests/workdir_warmup/models/en_US/general") == []
+
+    @pytest.mark.order1
+    def test_select_samples(self):
+        samples = [("a", "i1"), ("b", "i1"), ("c", "i2"), ("d", "i3")]
+        assert select_samples(samples, 2) == [("a", "i1"), ("c", "i2")]
+        assert select_samples(samples, 4) == [("a", "i1"), ("c", "i2"), ("d", "i3"), ("b", "i1")]
+        assert select_samples(samples, 0) == []
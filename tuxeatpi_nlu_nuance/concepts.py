@@ -0,0 +1,215 @@
+"""Module indexing concepts declared in trsx models and normalizing their values"""
+import datetime
+import xml.etree.ElementTree as ET
+
+
+# Nuance predefined concepts grouped by argument type
+NUMBER_CONCEPTS = ("nuance_CARDINAL_NUMBER", "nuance_ORDINAL_NUMBER", "nuance_NUMBER",
+                   "nuance_AMOUNT", "nuance_DOUBLE", "nuance_QUANTITY")
+DATETIME_CONCEPTS = ("nuance_CALENDARX", "nuance_DATE", "nuance_TIME")
+DURATION_CONCEPTS = ("nuance_DURATION",)
+# Keys of absolute dates and times, in datetime arguments order
+DATE_KEYS = ("nuance_YEAR", "nuance_MONTH", "nuance_DAY")
+TIME_KEYS = ("nuance_HOUR", "nuance_MINUTE", "nuance_SECOND")
+# Duration units in seconds
+DURATION_UNITS = {"nuance_DAYS": 86400,
+                  "nuance_HOURS": 3600,
+                  "nuance_MINUTES": 60,
+                  "nuance_SECONDS": 1,
+                  }
+
+
+class ConceptIndex(object):
+    """Lookup of concept types and dictionary entries by context and language
+
+    The index is filled from trsx files when models are loaded, so extracted
+    concept values only need a dictionary lookup to be normalized.
+    """
+
+    def __init__(self):
+        # {(context_tag, lang): {file_id: {concept_name: [isA concept names]}}}
+        self._concepts = {}
+        # {(context_tag, lang): {file_id: {concept_name: {literal: value}}}}
+        self._dictionaries = {}
+
+    def load(self, context_tag, lang, file_id, trsx_data):
+        """Index concepts and dictionaries declared in a trsx file"""
+        root = ET.fromstring(trsx_data)
+        concepts = {}
+        dictionaries = {}
+        for concept in root.iter("concept"):
+            name = concept.get("name")
+            if name is None:
+                continue
+            concepts[name] = [relation.get("conceptref") for relation in concept.iter("relation")
+                              if relation.get("type") == "isA" and relation.get("conceptref")]
+        for dictionary in root.iter("dictionary"):
+            name = dictionary.get("conceptref")
+            if name is None:
+                continue
+            entries = dictionaries.setdefault(name, {})
+            for entry in dictionary.iter("entry"):
+                literal = entry.get("literal", "").strip().lower()
+                entries[literal] = entry.get("value", entry.get("literal"))
+        self._concepts.setdefault((context_tag, lang), {})[file_id] = concepts
+        self._dictionaries.setdefault((context_tag, lang), {})[file_id] = dictionaries
+
+    def get_type(self, context_tag, lang, concept_name, _seen=None):
+        """Return the type of a concept, `string` if unknown
+
+        The type is inherited through `isA` relations
+        """
+        if concept_name in NUMBER_CONCEPTS:
+            return "number"
+        if concept_name in DATETIME_CONCEPTS:
+            return "datetime"
+        if concept_name in DURATION_CONCEPTS:
+            return "duration"
+        for dictionaries in self._dictionaries.get((context_tag, lang), {}).values():
+            if concept_name in dictionaries:
+                return "enum"
+        seen = _seen or set()
+        seen.add(concept_name)
+        for concepts in self._concepts.get((context_tag, lang), {}).values():
+            for parent_name in concepts.get(concept_name, []):
+                if parent_name in seen:
+                    continue
+                concept_type = self.get_type(context_tag, lang, parent_name, seen)
+                if concept_type != "string":
+                    return concept_type
+        return "string"
+
+    def get_entries(self, context_tag, lang, concept_name, _seen=None):
+        """Return dictionary entries of a concept as a {literal: value} dict
+
+        Entries are inherited through `isA` relations if the concept has none
+        """
+        entries = {}
+        for dictionaries in self._dictionaries.get((context_tag, lang), {}).values():
+            entries.update(dictionaries.get(concept_name, {}))
+        if entries:
+            return entries
+        seen = _seen or set()
+        seen.add(concept_name)
+        for concepts in self._concepts.get((context_tag, lang), {}).values():
+            for parent_name in concepts.get(concept_name, []):
+                if parent_name not in seen:
+                    entries.update(self.get_entries(context_tag, lang, parent_name, seen))
+        return entries
+
+    def normalize(self, context_tag, lang, concept_name, concept_values):
+        """Normalize concept values returned by Nuance NLU
+
+        Return a list of dicts with `type`, `literal`, `value` and `ranges` keys,
+        ordered like the Nuance results (the first one is the best match).
+        """
+        concept_type = self.get_type(context_tag, lang, concept_name)
+        entries = self.get_entries(context_tag, lang, concept_name)
+        normalized_values = []
+        for data in concept_values:
+            value = data.get('value')
+            literal = data.get('literal')
+            if concept_type == "number":
+                value = normalize_number(value)
+            elif concept_type == "datetime":
+                value = normalize_datetime(value)
+            elif concept_type == "duration":
+                value = normalize_duration(value)
+            elif concept_type == "enum":
+                value = normalize_enum(value, literal, entries)
+            normalized_values.append({"type": concept_type,
+                                      "literal": literal,
+                                      "value": value,
+                                      "ranges": data.get('ranges', []),
+                                      })
+        return normalized_values
+
+
+def normalize_number(value):
+    """Convert a Nuance number value to int or float"""
+    if isinstance(value, dict):
+        # Amounts and quantities wrap the number
+        for key in ("nuance_NUMBER", "nuance_CARDINAL_NUMBER", "nuance_DOUBLE"):
+            if key in value:
+                return normalize_number(value[key])
+        return value
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def normalize_datetime(value):
+    """Convert a Nuance calendar value to an ISO 8601 string
+
+    Return the raw value if it is not an absolute date and/or time,
+    or if it holds any information which would be lost by the conversion
+    """
+    if not isinstance(value, dict):
+        return value
+    # Absolute date and time can be wrapped by nuance_DATE and nuance_TIME
+    parts = {}
+    for key, part in value.items():
+        if key not in ("nuance_DATE", "nuance_TIME"):
+            parts[key] = part
+        elif isinstance(part, dict) and not set(part).intersection(parts):
+            parts.update(part)
+        else:
+            return value
+    if not parts or not set(parts).issubset(("nuance_DATE_ABS", "nuance_TIME_ABS")):
+        return value
+    date_value = parts.get("nuance_DATE_ABS")
+    time_value = parts.get("nuance_TIME_ABS")
+    try:
+        if date_value is not None:
+            if set(date_value) != set(DATE_KEYS):
+                return value
+            date = datetime.date(*[int(date_value[key]) for key in DATE_KEYS])
+        if time_value is not None:
+            if "nuance_HOUR" not in time_value or not set(time_value).issubset(TIME_KEYS):
+                return value
+            time_ = datetime.time(*[int(time_value.get(key, 0)) for key in TIME_KEYS])
+    except (TypeError, ValueError):
+        return value
+    if date_value is not None and time_value is not None:
+        return datetime.datetime.combine(date, time_).isoformat()
+    elif date_value is not None:
+        return date.isoformat()
+    return time_.isoformat()
+
+
+def normalize_duration(value):
+    """Convert a Nuance duration value to a number of seconds
+
+    Return the raw value if it has no known unit
+    """
+    if not isinstance(value, dict):
+        return value
+    duration = value.get("nuance_DURATION", value)
+    if not isinstance(duration, dict) or not set(duration).intersection(DURATION_UNITS):
+        return value
+    seconds = 0
+    for unit, unit_seconds in DURATION_UNITS.items():
+        if unit not in duration:
+            continue
+        number = normalize_number(duration[unit])
+        if isinstance(number, bool) or not isinstance(number, (int, float)):
+            return value
+        seconds += number * unit_seconds
+    return seconds
+
+
+def normalize_enum(value, literal, entries):
+    """Map a concept value to its dictionary value"""
+    if value in entries.values():
+        return value
+    for key in (value, literal):
+        if isinstance(key, str) and key.strip().lower() in entries:
+            return entries[key.strip().lower()]
+    return value
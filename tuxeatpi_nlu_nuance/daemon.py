@@ -3,16 +3,33 @@ import logging
 import os
 import signal
 import time
+import xml.etree.ElementTree as ET
 
 from tuxeatpi_common.daemon import TepBaseDaemon
 from tuxeatpi_common.error import TuxEatPiError
 from tuxeatpi_common.message import Message
 from tuxeatpi_common.wamp import is_wamp_topic, is_wamp_rpc
+from tuxeatpi_nlu_nuance.concepts import ConceptIndex
 from tuxeatpi_nlu_nuance.initializer import NLUInitializer
+from tuxeatpi_nlu_nuance.thresholds import IntentThresholds
+from tuxeatpi_nlu_nuance.warmup import read_model_samples, select_samples
 from pynuance import nlu
 from pynuance import mix
 
 
+def get_interpretations(nlu_return):
+    """Return the interpretations of a Nuance NLU result"""
+    if not isinstance(nlu_return, dict):
+        raise NLUError("Bad Nuance NLU result: {}".format(nlu_return))
+    return nlu_return.get("nlu_interpretation_results", {}).\
+        get("payload", {}).get("interpretations", [])
+
+
+def get_intent(interpretation):
+    """Return the intent of a Nuance NLU interpretation"""
+    return interpretation.get("action", {}).get("intent", {})
+
+
 class NLU(TepBaseDaemon):
     """Nuance Communications Service based NLU component class"""
 
@@ -25,8 +42,17 @@ class NLU(TepBaseDaemon):
         self.username = None
         self.password = None
         self._confidence_threshold = 0.7
+        self._warmup_samples = 3
+        # An accepted intent followed by another one within this delay is a correction
+        self._correction_delay = 10
+        self._last_accepted = None
+        # {(context_tag, lang): {"state": ..., "latency": ...}}
+        self._models_state = {}
         self._initializer = NLUInitializer(self)
+        self._concepts = ConceptIndex()
         self.models_folder = os.path.abspath(os.path.join(self.workdir, "models"))
+        self._thresholds = IntentThresholds(os.path.join(self.models_folder, "thresholds.json"),
+                                            self._confidence_threshold, logger=self.logger)
         self._cookies_file = os.path.abspath(os.path.join(self.workdir, "cookies.json"))
 
     def main_loop(self):
@@ -39,6 +65,9 @@ class NLU(TepBaseDaemon):
             result = self.send_intent(context_tag, language, component_name, file_name, data.value)
             if result:
                 self.build_model(context_tag, language)
+            else:
+                # Model not changed, check it is still attached
+                self.warm_up_model(context_tag, language)
 
     def set_config(self, config):
         """Save the configuration and reload the daemon"""
@@ -53,6 +82,9 @@ class NLU(TepBaseDaemon):
         self.username = config.get("username")
         self.password = config.get("password")
         self._confidence_threshold = config.get("confidence_threshold", 0.7)
+        self._thresholds.default = self._confidence_threshold
+        self._warmup_samples = config.get("warmup_samples", 3)
+        self._correction_delay = config.get("correction_delay", 10)
         return True
 
     @is_wamp_topic("text")
@@ -64,7 +96,8 @@ class NLU(TepBaseDaemon):
                                          text, self.settings.language)
         # We got a result
         self.logger.debug(raw_result)
-        result = self._handle_nlu_return(raw_result)
+        result = self._handle_nlu_return(raw_result, context_tag)
+        self._check_correction(result, context_tag)
 
         if result.get("error") in ('NO_MATCH', 'BAD_INTENT_NAME'):
             # No match
@@ -81,10 +114,12 @@ class NLU(TepBaseDaemon):
             return
         # Send request
         topic = "/".join((result["component"], result["capacity"]))
-        data = {"arguments": result.get("arguments", {})}
+        data = {"arguments": result.get("arguments", {}),
+                "concepts": result.get("concepts", {})}
         message = Message(topic=topic, data=data)
         self.logger.info("Publish %s with argument %s", message.topic, message.payload)
         self.publish(message)
+        self._set_accepted(result, context_tag)
 
     @is_wamp_rpc("audio")
     @is_wamp_topic("audio")
@@ -93,6 +128,8 @@ class NLU(TepBaseDaemon):
         self.logger.info("nlu/audio called")
 
         nlu_listening = True
+        # Low confidence result waiting for the user's answer
+        pending = None
         try:
             while nlu_listening:
                 # Disable hotword
@@ -102,7 +139,15 @@ class NLU(TepBaseDaemon):
                                                   self.settings.language)
                 # We got a result
                 self.logger.debug(raw_result)
-                result = self._handle_nlu_return(raw_result)
+                result = self._handle_nlu_return(raw_result, context_tag)
+                self._check_correction(result, context_tag)
+                if pending is not None and result.get("error") != "NO_INTERPRETATION":
+                    # Learn from the answer to the previous re-prompt
+                    # Nothing heard is not an answer, a misunderstood one is a rejection
+                    self._thresholds.record(context_tag, self.settings.language,
+                                            pending["intent"], pending["confidence"],
+                                            pending["intent"] == result.get("intent"))
+                pending = None
                 if result.get("error") == "NO_INTERPRETATION":
                     # No interpretation found
                     # This could mean: microphone muted, nobody spoke, ???
@@ -119,6 +164,8 @@ class NLU(TepBaseDaemon):
                 elif result.get("error") == "NEED_CONFIRMATION":
                     # Confidence too low
                     self.logger.warning("Confirmation needed: %s", result)
+                    pending = {"intent": result.get("intent"),
+                               "confidence": result.get("confidence")}
                     self.call("hotword.enable")
                     self.call("speech.say", text=self.get_dialog("uncertain"))
                     # Quit if we want to exit
@@ -138,10 +185,12 @@ class NLU(TepBaseDaemon):
                     self.call("hotword.enable")
                     # Send request
                     topic = ".".join((result["component"], result["capacity"]))
-                    data = {"arguments": result.get("arguments", {})}
+                    data = {"arguments": result.get("arguments", {}),
+                            "concepts": result.get("concepts", {})}
                     message = Message(topic=topic, data=data)
                     self.logger.info("Publish %s with argument %s", message.topic, message.payload)
                     self.publish(message)
+                    self._set_accepted(result, context_tag)
                     return
         # TODO improve this except
         except Exception as exp:  # pylint: disable=W0703
@@ -149,6 +198,13 @@ class NLU(TepBaseDaemon):
             self.logger.error(exp)
             self.call("hotword.enable")
 
+    @is_wamp_rpc("model_state")
+    def model_state(self, context_tag="general", language=None):
+        """Return the state of the model of a context"""
+        if language is None:
+            language = self.settings.language
+        return self._models_state.get((context_tag, language), {"state": "UNKNOWN"})
+
     @is_wamp_topic("test")
     def test(self):
         """NLU test to"""
@@ -169,23 +225,54 @@ class NLU(TepBaseDaemon):
     def reload(self):
         pass
 
-    def _handle_nlu_return(self, nlu_return):
+    def _set_accepted(self, result, context_tag):
+        """Remember the last accepted intent to detect its correction"""
+        self._last_accepted = {"intent": result.get("intent"),
+                               "confidence": result.get("confidence"),
+                               "context_tag": context_tag,
+                               "time": time.time(),
+                               }
+
+    def _check_correction(self, result, context_tag):
+        """Record the last accepted intent as rejected if the user
+        quickly says another intent
+        """
+        last_accepted = self._last_accepted
+        if last_accepted is None or result.get("error") == "NO_INTERPRETATION":
+            return
+        self._last_accepted = None
+        if time.time() - last_accepted["time"] > self._correction_delay:
+            return
+        if last_accepted["context_tag"] != context_tag:
+            return
+        # Only an other understood intent is a correction
+        if result.get("error") in ('NO_MATCH', 'BAD_INTENT_NAME'):
+            return
+        if result.get("intent") != last_accepted["intent"]:
+            self.logger.info("Intent %s corrected by %s",
+                             last_accepted["intent"], result.get("intent"))
+            self._thresholds.record(context_tag, self.settings.language,
+                                    last_accepted["intent"], last_accepted["confidence"],
+                                    False)
+
+    def _handle_nlu_return(self, nlu_return, context_tag="general"):
         """Handle nlu return by parsing result and formatting result
         to be transmission ready
         """
         result = {"component": None,
                   "capacity": None,
                   "arguments": None,
+                  "concepts": None,
+                  "intent": None,
                   "confidence": None,
                   "error": None,
                   }
         self.logger.debug(nlu_return)
-        interpretations = nlu_return.get("nlu_interpretation_results", {}).\
-            get("payload", {}).get("interpretations", {})
+        interpretations = get_interpretations(nlu_return)
         self.logger.info("Literals: %s",
                          [i.get("literal") for i in interpretations])
         self.logger.info("Interpretations: %s",
-                         [i.get("action", {}).get("intent", {}) for i in interpretations])
+                         [get_intent(i) for i in interpretations])
         # Not interpretations found
         if not interpretations:
             self.logger.warning("No interpretation found")
@@ -194,7 +281,8 @@ class NLU(TepBaseDaemon):
         # TODO: what about if len(interpretations) > 1 ??
         interpretation = interpretations[0]
         # Process the first interpretation
-        intent = interpretation.get("action", {}).get("intent", {})
+        intent = get_intent(interpretation)
+        result['intent'] = intent.get("value")
         result['confidence'] = intent.get("confidence")
         # Check intents
         if intent.get("value") == "NO_MATCH":
@@ -210,11 +298,12 @@ class NLU(TepBaseDaemon):
             result['error'] = "BAD_INTENT_NAME"
             return result
         # Check confidence
-        if result['confidence'] < self._confidence_threshold:
-            # TODO improve me
+        threshold = self._thresholds.get(context_tag, self.settings.language,
+                                         intent.get("value"))
+        if result['confidence'] < threshold:
             # I'm not sure to understand :/
-            self.logger.warning("Need confirmation - confidence: %s - %s",
-                                result['confidence'], result)
+            self.logger.warning("Need confirmation - confidence: %s - threshold: %s - %s",
+                                result['confidence'], threshold, result)
             result['error'] = "NEED_CONFIRMATION"
             return result
         # Something was understood
@@ -228,12 +317,16 @@ class NLU(TepBaseDaemon):
             return result
         # Get intent's arguments
         arguments = {}
+        concepts = {}
         for name, data in interpretation.get("concepts", {}).items():
-            arguments[name] = data[0].get('value')
+            concepts[name] = self._concepts.normalize(context_tag, self.settings.language,
+                                                      name, data)
+            arguments[name] = concepts[name][0].get('value') if concepts[name] else None
         # Prepare result
         result['component'] = component.replace("__", ".")
         result['capacity'] = capacity
         result['arguments'] = arguments
+        result['concepts'] = concepts
         result['confidence'] = intent.get("confidence")
         self.logger.info("Result: %s", result)
 
@@ -264,6 +357,12 @@ class NLU(TepBaseDaemon):
         if not os.path.exists(comp_folder):
             os.makedirs(comp_folder)
         model_filepath = os.path.join(comp_folder, model_file)
+        # Index concepts and dictionaries
+        try:
+            self._concepts.load(model_name, model_lang, "/".join((component_name, model_file)),
+                                model_data)
+        except ET.ParseError as exp:
+            self.logger.error("Can not index concepts of %s: %s", intent_id, exp)
         if os.path.isfile(model_filepath):
             with open(model_filepath, "r") as mfh:
                 old_model_data = mfh.read()
@@ -295,6 +394,7 @@ class NLU(TepBaseDaemon):
     def build_model(self, model_name, model_lang):
         """Update model in Nuance Mix"""
         self.logger.info("Building %s/%s", model_lang, model_name)
+        self._models_state[(model_name, model_lang)] = {"state": "BUILDING"}
         model_fullname = model_name + "__" + model_lang
         # Train model
         mix.train_model(model_fullname, cookies_file=self._cookies_file)
@@ -312,7 +412,8 @@ class NLU(TepBaseDaemon):
             builds = sorted(builds, key=lambda x: x.get('created_at'))
         if builds[-1].get('build_status') == 'FAILED':
             self.logger.error("Error building model")
-            # TODO handle failed
+            self._models_state[(model_name, model_lang)] = {"state": "FAILED"}
+            return
         elif builds[-1].get('build_status') == 'COMPLETED':
             self.logger.info("Build for %s done", model_fullname)
         # TODO handle other status
@@ -320,11 +421,55 @@ class NLU(TepBaseDaemon):
         try:
             mix.model_build_attach(model_fullname, context_tag=model_name,
                                    cookies_file=self._cookies_file)
-            self.logger.info("Build %s ready", model_fullname)
-        except Exception:  # pylint: disable=W0703
-            # Build already attached
-            # TODO clean this
-            pass
+            self.logger.info("Build %s attached", model_fullname)
+        except Exception as exp:  # pylint: disable=W0703
+            # Build could be already attached, the warm up will tell us
+            self.logger.warning("Can not attach build %s: %s", model_fullname, exp)
+        self.warm_up_model(model_name, model_lang)
+
+    def warm_up_model(self, model_name, model_lang):
+        """Send model samples to Nuance NLU and mark the model as ready
+        if the expected intents are found
+
+        The model is marked as unverified if there is no sample to send
+        """
+        model_folder = os.path.join(self.models_folder, model_lang, model_name)
+        samples = select_samples(read_model_samples(model_folder), self._warmup_samples)
+        self._models_state[(model_name, model_lang)] = {"state": "WARMING_UP"}
+        self.logger.info("Warming up %s/%s with %s samples", model_lang, model_name, len(samples))
+        latencies = []
+        errors = []
+        for text, expected_intent in samples:
+            start_time = time.time()
+            try:
+                raw_result = nlu.understand_text(self.app_id, self.app_key, model_name,
+                                                 text, model_lang)
+                latency = time.time() - start_time
+                interpretations = get_interpretations(raw_result)
+                intent = get_intent(interpretations[0]).get("value") if interpretations else None
+            except Exception as exp:  # pylint: disable=W0703
+                errors.append({"text": text, "error": str(exp)})
+                continue
+            latencies.append(latency)
+            if intent != expected_intent:
+                errors.append({"text": text, "expected": expected_intent, "intent": intent})
+        state = {"state": "READY",
+                 "latency": max(latencies) if latencies else None,
+                 "latencies": latencies,
+                 "errors": errors,
+                 }
+        if not samples:
+            # Nothing was checked
+            state["state"] = "UNVERIFIED"
+            self.logger.warning("No sample to warm up %s/%s", model_lang, model_name)
+        elif errors:
+            state["state"] = "FAILED"
+            self.logger.error("Warm up of %s/%s failed: %s", model_lang, model_name, errors)
+        else:
+            self.logger.info("Model %s/%s ready - warm up latency: %s",
+                             model_lang, model_name, state["latency"])
+        self._models_state[(model_name, model_lang)] = state
+        return state["state"] == "READY"
 
 
 class NLUError(TuxEatPiError):
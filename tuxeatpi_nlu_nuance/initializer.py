@@ -31,12 +31,17 @@ class NLUInitializer(Initializer):
                                               recursive=True, wait=False)
         if intents is None:
             return
+        models = set()
         updated_models = set()
         for intent in intents.children:
             _, _, _, intent_lang, intent_name, component_name, file_name = intent.key.split("/")
+            models.add((intent_name, intent_lang))
             result = self.component.send_intent(intent_name, intent_lang, component_name,
                                                 file_name, intent.value)
             if result:
                 updated_models.add((intent_name, intent_lang))
         for model in updated_models:
             self.component.build_model(model[0], model[1])
+        # Unchanged models are already attached, just check them
+        for model in models - updated_models:
+            self.component.warm_up_model(model[0], model[1])
@@ -0,0 +1,91 @@
+"""Module handling confidence thresholds learned per intent"""
+import json
+import logging
+import os
+
+
+class IntentThresholds(object):
+    """Per intent confidence thresholds updated from dialog outcomes
+
+    An intent confirmed by the user after a low confidence result gets its
+    threshold lowered towards that confidence, but never down to a confidence
+    at which it was already rejected; an intent rejected at a confidence
+    reaching its threshold (an accepted intent corrected by the user) gets its
+    threshold raised above that confidence.
+    The table is saved as json next to the models.
+    """
+
+    def __init__(self, filepath, default=0.7, min_threshold=0.3, max_threshold=0.95,
+                 learning_rate=0.2, margin=0.05, logger=None):
+        self.filepath = filepath
+        self.logger = logger or logging.getLogger(__name__)
+        self.default = default
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.learning_rate = learning_rate
+        self.margin = margin
+        # {lang: {context_tag: {intent: {"threshold": x, "confirmed": n, "rejected": n,
+        #                                "rejected_confidence": x}}}}
+        self._table = {}
+        self.load()
+
+    def load(self):
+        """Load thresholds from the json file"""
+        if not os.path.isfile(self.filepath):
+            return
+        with open(self.filepath, "r") as tfh:
+            try:
+                table = json.load(tfh)
+            except ValueError as exp:
+                self.logger.error("Can not load thresholds from %s: %s", self.filepath, exp)
+                return
+        if not isinstance(table, dict):
+            self.logger.error("Can not load thresholds from %s: bad format", self.filepath)
+            return
+        self._table = table
+
+    def save(self):
+        """Save thresholds to the json file"""
+        folder = os.path.dirname(self.filepath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        # Write a temporary file first so a crash can not truncate the table
+        tmp_filepath = self.filepath + ".tmp"
+        with open(tmp_filepath, "w") as tfh:
+            json.dump(self._table, tfh, indent=2, sort_keys=True)
+        os.replace(tmp_filepath, self.filepath)
+
+    def get(self, context_tag, lang, intent):
+        """Return the confidence threshold of an intent"""
+        stats = self._table.get(lang, {}).get(context_tag, {}).get(intent)
+        if stats is None:
+            return self.default
+        return stats["threshold"]
+
+    def record(self, context_tag, lang, intent, confidence, confirmed):
+        """Update the threshold of an intent from a dialog outcome
+
+        `confirmed` is True if the intent was confirmed by the user,
+        False if the user corrected it with another intent or was not understood.
+        """
+        stats = self._table.setdefault(lang, {}).setdefault(context_tag, {}).setdefault(
+            intent, {"threshold": self.default, "confirmed": 0, "rejected": 0})
+        threshold = stats["threshold"]
+        rejected_confidence = stats.get("rejected_confidence")
+        if confirmed:
+            stats["confirmed"] += 1
+            if confidence < threshold:
+                threshold -= self.learning_rate * (threshold - confidence)
+                # Do not accept confidences which were already wrong
+                if rejected_confidence is not None:
+                    threshold = max(threshold, min(stats["threshold"],
+                                                   rejected_confidence + self.margin))
+        else:
+            stats["rejected"] += 1
+            if rejected_confidence is None or confidence > rejected_confidence:
+                stats["rejected_confidence"] = confidence
+            if confidence >= threshold:
+                threshold = confidence + self.margin
+        stats["threshold"] = min(self.max_threshold, max(self.min_threshold, threshold))
+        self.save()
+        return stats["threshold"]
@@ -0,0 +1,53 @@
+"""Module helping to warm up Nuance models after a build attach"""
+import os
+import xml.etree.ElementTree as ET
+
+
+def read_samples(trsx_data):
+    """Return the samples of a trsx file as a list of (text, intent) tuples"""
+    root = ET.fromstring(trsx_data)
+    samples = []
+    for sample in root.iter("sample"):
+        # Samples can contain annotations, keep only the text
+        text = " ".join("".join(sample.itertext()).split())
+        if text and sample.get("intentref"):
+            samples.append((text, sample.get("intentref")))
+    return samples
+
+
+def read_model_samples(model_folder):
+    """Return samples of all trsx files saved in a model folder"""
+    samples = []
+    if not os.path.isdir(model_folder):
+        return samples
+    for component_name in sorted(os.listdir(model_folder)):
+        comp_folder = os.path.join(model_folder, component_name)
+        if not os.path.isdir(comp_folder):
+            continue
+        for file_name in sorted(os.listdir(comp_folder)):
+            try:
+                with open(os.path.join(comp_folder, file_name), "r") as mfh:
+                    samples.extend(read_samples(mfh.read()))
+            except (ET.ParseError, UnicodeDecodeError):
+                continue
+    return samples
+
+
+def select_samples(samples, count):
+    """Select up to `count` samples, covering as many intents as possible"""
+    selected = []
+    intents = set()
+    # First one sample per intent
+    for text, intent in samples:
+        if len(selected) >= count:
+            return selected
+        if intent not in intents:
+            intents.add(intent)
+            selected.append((text, intent))
+    # Then fill with the remaining samples
+    for sample in samples:
+        if len(selected) >= count:
+            break
+        if sample not in selected:
+            selected.append(sample)
+    return selected